@@ -1,25 +1,27 @@
 import os
 import numpy as np
 import tensorflow as tf
-from collections import deque
 import random
 
-from src.agent.model import build_masked_transformer
+from src.agent.model import build_masked_transformer, build_inference_fn
+from src.agent.replay_buffer import ReplayBuffer
 from src.utils.vectorizer import vectorize_event, vectorize_choice
 
 
 class MahjongAgent:
-    def __init__(self, agent_id, model_dir, base_model_name, config):
+    def __init__(self, agent_id, model_dir, base_model_name, config, shared_model=None):
         """
         __init__ メソッドに agent_id パラメータを追加
+        shared_model を渡した場合はモデルを読み込まず、他のエージェントと同じモデルを参照する
         """
         self.agent_id = agent_id  # agent_id をインスタンス変数として保存
         self.config = config
         self.model_dir = model_dir
         self.base_model_name = base_model_name
-        self.memory = deque(maxlen=2000)
+        self.memory = ReplayBuffer(capacity=2000)
 
-        self.model = self._load_or_initialize_model()
+        self.model = shared_model if shared_model is not None else self._load_or_initialize_model()
+        self._infer = None  # 推論用のグラフ関数。初回の推論時に1度だけトレースする
 
     def _find_latest_model(self):
         """
@@ -30,19 +32,19 @@ class MahjongAgent:
             return None
 
         # バージョン番号付きのモデル（例: tenho_model_v50.keras）のみを対象とする
-        model_files = [f for f in os.listdir(self.model_dir) if f.startswith(
-            self.base_model_name) and f.endswith('.keras') and '_v' in f]
-        if not model_files:
-            return None
-
-        # バージョン番号に基づいてファイルをソートし、最新のものを返す
-        try:
-            latest_file = max(model_files, key=lambda x: int(
-                x.split('_v')[-1].split('.')[0]))
-            return os.path.join(self.model_dir, latest_file)
-        except (ValueError, IndexError):
-            # 不正な形式のファイル名を無視する
-            return None
+        # ファイル名の形式は固定のため、接頭辞・拡張子の比較と切り出しだけでバージョン番号を得る
+        prefix, suffix = f"{self.base_model_name}_v", ".keras"
+        latest_version, latest_path = -1, None
+        with os.scandir(self.model_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith(prefix) and name.endswith(suffix)):
+                    continue
+                version = name[len(prefix):-len(suffix)]
+                # 不正な形式のファイル名を無視する
+                if version.isdigit() and int(version) > latest_version:
+                    latest_version, latest_path = int(version), entry.path
+        return latest_path
 
     def _load_or_initialize_model(self):
         """
@@ -114,11 +116,30 @@ class MahjongAgent:
             return None
         return random.choice(legal_actions)
 
+    def predict_logits(self, context, choices, mask):
+        """
+        選択肢毎のスコア(logit)を推論する。
+
+        Args:
+            context (np.ndarray): (batch, MAX_CONTEXT_LENGTH, VECTOR_DIM) のイベント系列。
+            choices (np.ndarray): (batch, MAX_CHOICES, VECTOR_DIM) の選択肢。
+            mask (np.ndarray): (batch, MAX_CHOICES) の有効な選択肢を1とするマスク。
+
+        Returns:
+            np.ndarray: (batch, MAX_CHOICES) のスコア。
+        """
+        if self._infer is None:
+            self._infer = build_inference_fn(self.model)
+        return self._infer(
+            tf.convert_to_tensor(context, dtype=tf.float32),
+            tf.convert_to_tensor(choices, dtype=tf.float32),
+            tf.convert_to_tensor(mask, dtype=tf.float32)).numpy()
+
     def remember(self, state, action, reward, next_state, done):
         """
         エージェントの経験をメモリに追加する。
         """
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def replay(self):
         """
@@ -127,9 +148,10 @@ class MahjongAgent:
         if len(self.memory) < self.config['training']['batch_size']:
             return
 
-        minibatch = random.sample(
-            self.memory, self.config['training']['batch_size'])
-        for state, action, reward, next_state, done in minibatch:
+        # 経験は項目毎の配列として取り出され、モデルにはそのままバッチとして渡せる
+        states, actions, rewards, next_states, dones = self.memory.sample(
+            self.config['training']['batch_size'])
+        for reward, done in zip(rewards, dones):
             target = reward
             if not done:
                 # ここにQ学習やポリシーグラディエントなどの学習ロジックが入る
@@ -137,12 +159,18 @@ class MahjongAgent:
             # (仮実装) 学習ロジックをここに追加
             # self.model.fit(...)
 
-    def save_model(self, game_number):
+    def save_model(self, game_number, weights=None):
         """
         現在のモデルをバージョン番号付きで保存する。
+        weights (model.get_weights()の結果) を渡した場合は、その重みを設定したモデルの複製を保存する。
+        学習と並行して別スレッドで保存する場合に、保存中の重みの更新が保存内容に混ざらないようにする。
         """
+        model = self.model
+        if weights is not None:
+            model = tf.keras.models.clone_model(self.model)
+            model.set_weights(weights)
         versioned_model_name = f"{self.base_model_name}_v{game_number}.keras"
         save_path = os.path.join(self.model_dir, versioned_model_name)
-        self.model.save(save_path)
+        model.save(save_path)
         print(f"Model for agent {self.agent_id} saved to {save_path}")
 
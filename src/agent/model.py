@@ -49,3 +49,18 @@ def build_masked_transformer(
     final_logits = layers.Add()([masked_logits, mask_adder])
     
     return tf.keras.Model(inputs=[context_input, choices_input, mask_input], outputs=final_logits)
+
+def build_inference_fn(model):
+    """
+    モデルの推論を固定形状のグラフとして1度だけトレースした関数を返す。
+    Kerasモデルを直接呼ぶとeager実行となり、小さなバッチでは呼び出し毎のPython側の処理が支配的になるため、
+    自己対戦中の推論はこの関数を経由させる。入力形状を固定しているため、バッチサイズが変わっても再トレースされない。
+    """
+    @tf.function(input_signature=[
+        tf.TensorSpec(shape=(None,) + tuple(model.inputs[0].shape[1:]), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,) + tuple(model.inputs[1].shape[1:]), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,) + tuple(model.inputs[2].shape[1:]), dtype=tf.float32),
+    ])
+    def infer(context, choices, mask):
+        return model([context, choices, mask], training=False)
+    return infer
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+エージェントの経験を保持するリングバッファ。
+経験をタプルのリストとして持つ代わりに項目毎の配列に格納し、学習時にバッチをまとめて取り出せるようにする。
+"""
+import random
+import numpy as np
+from src.constants import VECTOR_DIM
+
+class ReplayBuffer:
+    def __init__(self, capacity, state_dim=VECTOR_DIM, state_dtype=np.float16):
+        """
+        Args:
+            capacity (int): 保持する経験の最大数。超えた場合は古い経験から上書きする。
+            state_dim (int, optional): ベクトル化された状態の次元数。
+            state_dtype (np.dtype, optional): 状態を保持する型。状態の特徴量は牌の枚数や巡目などの小さな整数と
+                                              正規化済みの値のため、既定では半精度で保持してメモリ量を半分にする
+                                              (2048までの整数は半精度でも誤差なく表せる)。
+        """
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_dim), dtype=state_dtype)
+        self.next_states = np.zeros((capacity, state_dim), dtype=state_dtype)
+        # 行動は(action_type, tile)のタプルのため、そのまま参照を持つ
+        self.actions = np.empty(capacity, dtype=object)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, state, action, reward, next_state, done):
+        """経験を1件追加する"""
+        i = self._next
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        経験を重複なしで無作為に取り出す。
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones)。いずれも先頭の次元がbatch_sizeの配列。
+                   状態はモデルの入力に合わせてfloat32で返す。
+        """
+        idx = np.array(random.sample(range(self._size), batch_size))
+        return (self.states[idx].astype(np.float32), self.actions[idx], self.rewards[idx],
+                self.next_states[idx].astype(np.float32), self.dones[idx])
@@ -1,6 +1,30 @@
+from enum import IntEnum
+
 class Constants:
     NOTEN_BAPPU = 3000  # 不聴罰符の合計点
 
+class ActionType(IntEnum):
+    """
+    ACTION_系の選択肢の種類を表す整数ID (doc/model_architecture.md の「アクション ID」)。
+    文字列ラベルの比較・解析の代わりに、整数の比較や参照表の添字として使う。
+    """
+    PASS = 0
+    TSUMO = 1
+    RON = 2
+    RIICHI = 3
+    PUNG = 4
+    CHII = 5
+    DAIMINKAN = 6
+    ANKAN = 7
+    KAKAN = 8
+
+# 選択肢ラベル(ACTION_を除いた種類部分)からActionTypeへの対応表
+ACTION_LABEL_TO_TYPE = {
+    "PASS": ActionType.PASS, "TSUMO_AGARI": ActionType.TSUMO, "RON_AGARI": ActionType.RON,
+    "RIICHI": ActionType.RIICHI, "PUNG": ActionType.PUNG, "CHII": ActionType.CHII,
+    "DAIMINKAN": ActionType.DAIMINKAN, "ANKAN": ActionType.ANKAN, "KAKAN": ActionType.KAKAN,
+}
+
 # --- AIモデル ハイパーパラメータ ---
 
 # AIが一度に考慮する過去のイベントの最大数
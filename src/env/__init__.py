@@ -3,3 +3,5 @@
 
 # MahjongEnvクラスをパッケージ外からインポートしやすくするために定義します。
 from .mahjong_env import MahjongEnv
+from .vector_env import VectorMahjongEnv
+from .subproc_env import SubprocMahjongEnv
@@ -4,6 +4,7 @@
 赤ドラなどのルールを考慮した、より堅牢な実装。
 """
 import random
+from collections import deque
 
 class Deck:
     def __init__(self, rules=None):
@@ -19,6 +20,39 @@ class Deck:
 
         self._build_deck(rules)
         random.shuffle(self.tiles)
+        # 山は常に先頭から引くため、O(1)で取り出せるdequeで保持する
+        self.tiles = deque(self.tiles)
+
+    def draw(self):
+        """
+        山の先頭から牌を1枚引く。
+
+        Returns:
+            int: 引いた牌のID (136形式)。
+        """
+        return self.tiles.popleft()
+
+    def draw_many(self, count):
+        """
+        山の先頭から牌をまとめて引く。
+
+        Args:
+            count (int): 引く枚数。
+
+        Returns:
+            list: 引いた牌のID (136形式) のリスト。山から引いた順に並ぶ。
+        """
+        popleft = self.tiles.popleft
+        return [popleft() for _ in range(count)]
+
+    def is_empty(self):
+        """
+        山に牌が残っていないかを返す。
+
+        Returns:
+            bool: 山が空であればTrue。
+        """
+        return not self.tiles
 
     def _build_deck(self, rules):
         """
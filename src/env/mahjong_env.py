@@ -1,27 +1,61 @@
+from bisect import insort
+from types import MappingProxyType
 import numpy as np
 from mahjong.shanten import Shanten
 from mahjong.hand_calculating.hand import HandCalculator
-from mahjong.hand_calculating.hand_config import HandConfig  # 修正: GameRoundConfigを削除
+from mahjong.hand_calculating.hand_config import HandConfig, OptionalRules  # 修正: GameRoundConfigを削除
 from mahjong.tile import TilesConverter
 from mahjong.meld import Meld
 from .deck import Deck
 from ..constants import Constants
 
+# step()が返す追加情報。中身を持たないため読み取り専用の1インスタンスを使い回す
+_EMPTY_INFO = MappingProxyType({})
+
+# 和了判定の設定はツモ/ロンの別しか変わらないため、呼び出し毎に生成せず両方を作っておく (赤ドラ有効)
+_WIN_CONFIGS = {is_tsumo: HandConfig(is_tsumo=is_tsumo, options=OptionalRules(has_aka_dora=True)) for is_tsumo in (True, False)}
+
+# 流局時の聴牌者数毎の (聴牌者1人の受取額, 不聴者1人の支払額)。全員聴牌・全員不聴では点数が動かないため含めない
+_NOTEN_PAYMENTS = {n: (Constants.NOTEN_BAPPU // n, Constants.NOTEN_BAPPU // (4 - n)) for n in (1, 2, 3)}
+
 class Player:
-    def __init__(self, player_id):
+    def __init__(self, player_id, scores=None, hand_34=None):
         self.player_id = player_id
-        self.hand = []  # 136形式の牌
+        # 34形式の枚数は卓全体の枚数表 (4, 34) の1行として保持し、状態のベクトル化で表ごと写せるようにする
+        self.hand_34 = hand_34 if hand_34 is not None else np.zeros(34, dtype=np.int8)
+        self.hand = []  # 136形式の牌。hand_34(34形式の枚数)も併せて保持される
         self.discards = []
         self.melds = []  # 副露
         self.riichi = False
-        self.score = 25000
+        # 点数は卓全体の点数配列の1要素として保持し、精算をベクトル演算でまとめて行えるようにする
+        self._scores = scores if scores is not None else np.full(4, 25000, dtype=np.int32)
+
+    @property
+    def hand(self):
+        return self._hand
+
+    @hand.setter
+    def hand(self, tiles):
+        # シャンテン計算用に34形式の枚数を併せて持ち、以降はツモ・打牌毎に1要素だけ更新する
+        self._hand = tiles
+        self.hand_34[:] = TilesConverter.to_34_array(tiles)
+
+    @property
+    def score(self):
+        return int(self._scores[self.player_id])
+
+    @score.setter
+    def score(self, value):
+        self._scores[self.player_id] = value
 
     def draw(self, tile):
-        self.hand.append(tile)
-        self.hand.sort()
+        # 手牌はソート済みのため、全体を並べ直さず挿入位置へ入れる
+        insort(self._hand, tile)
+        self.hand_34[tile >> 2] += 1
 
     def discard(self, tile):
-        self.hand.remove(tile)
+        self._hand.remove(tile)
+        self.hand_34[tile >> 2] -= 1
         self.discards.append(tile)
         return tile
     
@@ -29,6 +63,7 @@ class Player:
         return {
             "player_id": self.player_id,
             "hand": self.hand,
+            "hand_34": self.hand_34.copy(),
             "discards": self.discards,
             "melds": [
                 {
@@ -45,25 +80,35 @@ class Player:
         }
 
 class MahjongEnv:
-    def __init__(self):
+    def __init__(self, scores=None):
+        """
+        Args:
+            scores (np.ndarray, optional): 点数を書き込む長さ4のint32配列。
+                                           VectorMahjongEnvが一括管理する点数表の行を渡す場合に指定する。
+        """
         self.shanten_calculator = Shanten()
         self.calculator = HandCalculator()
+        self.scores = scores if scores is not None else np.empty(4, dtype=np.int32)
+        self.hand_counts = np.zeros((4, 34), dtype=np.int8)  # 各プレイヤーの手牌の34形式の枚数
+        self._action_handlers = {"discard": self._step_discard}
         self.reset()
 
     def reset(self):
         self.deck = Deck()
-        self.players = [Player(i) for i in range(4)]
+        self.scores[:] = 25000
+        self.players = [Player(i, self.scores, self.hand_counts[i]) for i in range(4)]
         self.current_player_id = 0
         self.turn = 0
         self.dora_indicators = [self.deck.draw()]
         self.ura_dora_indicators = []
         self.game_over = False
         self.game_log = []
+        self._shanten_cache = {}
 
-        # 配牌
-        for _ in range(13):
-            for player in self.players:
-                player.draw(self.deck.draw())
+        # 配牌。1枚ずつ順に配った場合と同じく、席iには山の先頭52枚のうちi, i+4, i+8, ...番目の牌が渡る
+        dealt = self.deck.draw_many(13 * 4)
+        for i, player in enumerate(self.players):
+            player.hand = sorted(dealt[i::4])
         
         # 初期ツモ
         self.players[self.current_player_id].draw(self.deck.draw())
@@ -76,43 +121,49 @@ class MahjongEnv:
         action: (action_type, tile)
         action_type: "discard", "chi", "pon", "kan", "riichi", "tsumo"
         """
-        player = self.players[self.current_player_id]
         action_type, tile = action
 
-        reward = 0
-        done = False
-
-        if action_type == "discard":
-            player.discard(tile)
-            
-            # 他のプレイヤーが和了できるかチェック
-            for other_player in self.players:
-                if other_player.player_id != self.current_player_id:
-                    win_result = self._check_win(other_player, tile, is_tsumo=False)
-                    if win_result:
-                        # ロン和了処理
-                        reward = self._handle_win(win_result, other_player, from_player=player)
-                        done = True
-                        self.game_over = True
-                        return self._get_state(), reward, done, {}
-            
-            # 次のプレイヤーへ
-            self.current_player_id = (self.current_player_id + 1) % 4
-            if not self.deck.is_empty():
-                 self.players[self.current_player_id].draw(self.deck.draw())
-            else:
-                reward = self._handle_ryukyoku()
-                done = True
+        # アクション種別毎の処理は__init__で作った表から引く。局が終わった場合は処理側が結果を返す
+        handler = self._action_handlers.get(action_type)
+        if handler is not None:
+            result = handler(tile)
+            if result is not None:
+                return result
 
         # TODO: その他のアクション（チー、ポン、カンなど）を実装
 
+        self.turn += 1
+
+        # 山が尽きたら流局。終局時のみ理由を持つinfoを作り、通常のステップでは共有の空infoを返す
         if self.deck.is_empty():
             reward = self._handle_ryukyoku()
-            done = True
+            return self._get_state(), reward, True, {"reason": "ryukyoku"}
+        
+        return self._get_state(), 0, False, _EMPTY_INFO
 
-        self.turn += 1
+    def _step_discard(self, tile):
+        """打牌処理。ロン和了で局が終わった場合のみstep()の戻り値を返す"""
+        players = self.players
+        current_player_id = self.current_player_id
+        player = players[current_player_id]
+        player.discard(tile)
         
-        return self._get_state(), reward, done, {}
+        # 他のプレイヤーが和了できるかチェック（下家から順に判定し、頭ハネとする）
+        # 4人固定のため、席の進行は剰余ではなく下位2ビットのマスクで求める
+        for offset in range(1, 4):
+            other_player = players[(current_player_id + offset) & 3]
+            win_result = self._check_win(other_player, tile, is_tsumo=False)
+            if win_result:
+                # ロン和了処理
+                reward = self._handle_win(win_result, other_player, from_player=player)
+                self.game_over = True
+                return self._get_state(), reward, True, {"reason": "ron", "winner": other_player.player_id}
+        
+        # 次のプレイヤーへ
+        self.current_player_id = current_player_id = (current_player_id + 1) & 3
+        if not self.deck.is_empty():
+             players[current_player_id].draw(self.deck.draw())
+        return None
 
     def _get_state(self):
         """現在のゲーム状態を返す"""
@@ -125,26 +176,31 @@ class MahjongEnv:
         }
         return state
 
+    def _calculate_shanten(self, player):
+        """
+        プレイヤーの手牌のシャンテン数を返す。
+        同じ手牌は打牌毎のロン判定や流局時の聴牌判定で繰り返し問われるため、牌種構成をキーに局内でメモ化する。
+        牌種構成はPlayerがツモ・打牌毎に更新するhand_34をそのまま使い、136形式からの変換は行わない。
+        """
+        hand_34 = player.hand_34
+        key = hand_34.tobytes()
+        shanten = self._shanten_cache.get(key)
+        if shanten is None:
+            shanten = self._shanten_cache[key] = self.shanten_calculator.calculate_shanten(hand_34.tolist())
+        return shanten
+
     def _check_win(self, player, win_tile, is_tsumo=True):
         """和了判定を行う"""
-        tiles = TilesConverter.to_34_array(player.hand)
-        
         # shanten数が-1（和了）でなければNoneを返す
-        shanten = self.shanten_calculator.calculate_shanten(tiles, closed_hand=True)
+        shanten = self._calculate_shanten(player)
         if shanten != -1:
             return None
         
-        # 修正: HandConfigをここで生成する
-        config = HandConfig(
-            is_tsumo=is_tsumo,
-            aka_dora_enabled=True  # 赤ドラを有効にする
-        )
-
         # HandCalculatorで役と点数を計算
         result = self.calculator.estimate_hand_value(
             player.hand,
             win_tile,
-            config=config
+            config=_WIN_CONFIGS[is_tsumo]
         )
 
         # 役がなければ和了ではない
@@ -168,41 +224,21 @@ class MahjongEnv:
 
     def _handle_ryukyoku(self):
         """流局処理（荒牌平局）"""
-        tenpai_players = []
-        noten_players = []
-
-        for p in self.players:
-            tiles_34 = TilesConverter.to_34_array(p.hand)
-            melds_34 = [TilesConverter.to_34_array(meld.tiles) for meld in p.melds]
-
-            # 副露を考慮したシャンテン数を計算
-            shanten = self.shanten_calculator.calculate_shanten(tiles_34, melds=melds_34)
-            
-            # シャンテン数が0以下（聴牌）か判定
-            if shanten <= 0:
-                tenpai_players.append(p)
-            else:
-                noten_players.append(p)
-
-        # 不聴罰符の精算
-        num_tenpai = len(tenpai_players)
-        num_noten = len(noten_players)
+        # シャンテン数が0以下（聴牌）かをプレイヤー毎のマスクとして求める
+        # 副露した牌は手牌に含まれないため、手牌の枚数から副露を考慮したシャンテン数が計算される
+        tenpai_mask = np.array([self._calculate_shanten(p) for p in self.players]) <= 0
+
+        self.game_over = True
 
         # 全員聴牌または全員不聴の場合は点数移動なし
-        if num_tenpai == 0 or num_tenpai == 4:
+        if tenpai_mask.all() or not tenpai_mask.any():
             return 0
-        
-        # 役満払いなどの特殊なケースは未実装
-        payment_per_noten = Constants.NOTEN_BAPPU / num_noten
-        reward_per_tenpai = Constants.NOTEN_BAPPU / num_tenpai
 
-        for p in noten_players:
-            p.score -= payment_per_noten
-        
-        for p in tenpai_players:
-            p.score += reward_per_tenpai
+        # 不聴罰符の精算。役満払いなどの特殊なケースは未実装
+        reward_per_tenpai, payment_per_noten = _NOTEN_PAYMENTS[int(tenpai_mask.sum())]
+
+        self.scores += np.where(tenpai_mask, reward_per_tenpai, -payment_per_noten).astype(np.int32)
 
-        self.game_over = True
         return 0 # 流局自体の報酬は0とする
 
     def render(self):
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+MahjongEnvを環境毎に別プロセスで動かし、複数の対局を並列に進めるための環境。
+各MahjongEnvは他の環境と状態を共有しないため、プロセス毎に1つずつ持たせてPipeで操作する。
+"""
+import multiprocessing as mp
+import numpy as np
+from .mahjong_env import MahjongEnv, _EMPTY_INFO
+
+def _worker(conn):
+    """子プロセス側で1つの環境を保持し、親プロセスからのコマンドを処理する"""
+    env = MahjongEnv()
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == "step":
+                state, reward, done, info = env.step(data)
+                # 共有の空info(読み取り専用でpickleできない)はNoneとして送り、親プロセス側で共有インスタンスに戻す
+                conn.send((state, reward, done, None if info is _EMPTY_INFO else info))
+            elif command == "reset":
+                conn.send(env.reset())
+            elif command == "close":
+                break
+    finally:
+        conn.close()
+
+class SubprocMahjongEnv:
+    def __init__(self, num_envs, start_method=None):
+        """
+        Args:
+            num_envs (int): 並列に進行させる環境(プロセス)の数。
+            start_method (str, optional): multiprocessingの起動方式 ('fork', 'spawn' など)。
+                                          省略時はプラットフォームの既定値を使う。
+        """
+        ctx = mp.get_context(start_method)
+        self.num_envs = num_envs
+        self._conns, self._processes = [], []
+        for _ in range(num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.closed = False
+
+    def reset(self):
+        """
+        全環境を初期化する。
+
+        Returns:
+            list: 環境毎の初期状態。
+        """
+        for conn in self._conns:
+            conn.send(("reset", None))
+        return [conn.recv() for conn in self._conns]
+
+    def step(self, actions):
+        """
+        全環境にアクションを送り、各プロセスで同時に1ステップ進める。
+
+        Args:
+            actions (list): 環境毎のアクション (action_type, tile)。
+
+        Returns:
+            tuple: (環境毎の状態のリスト, 報酬の配列 (num_envs,), 終了フラグの配列 (num_envs,), 環境毎の追加情報のリスト)
+        """
+        # 先に全プロセスへ送信してから受信することで、各環境のステップを並列に実行させる
+        for conn, action in zip(self._conns, actions):
+            conn.send(("step", action))
+        states, rewards, dones, infos = zip(*[conn.recv() for conn in self._conns])
+        infos = [_EMPTY_INFO if info is None else info for info in infos]
+        return list(states), np.array(rewards, dtype=np.int32), np.array(dones, dtype=bool), infos
+
+    def close(self):
+        """全ワーカープロセスを終了させる。"""
+        if self.closed:
+            return
+        for conn in self._conns:
+            conn.send(("close", None))
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self.closed = True
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+複数のMahjongEnvを同時に進行させるための環境。
+強化学習では1環境あたりのステップ速度が律速となるため、N個の環境をまとめて1ステップずつ進める。
+"""
+import numpy as np
+from .mahjong_env import MahjongEnv, _EMPTY_INFO
+
+class VectorMahjongEnv:
+    def __init__(self, num_envs):
+        """
+        Args:
+            num_envs (int): 同時に進行させる環境の数。
+        """
+        self.num_envs = num_envs
+        # 点数は(環境数, 4)の配列で一括保持し、各環境にはその行(ビュー)を渡して共有する
+        self.scores = np.full((num_envs, 4), 25000, dtype=np.int32)
+        self.envs = [MahjongEnv(scores=self.scores[i]) for i in range(num_envs)]
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self._states = [env._get_state() for env in self.envs]
+
+    def reset(self):
+        """
+        全環境を初期化する。
+
+        Returns:
+            list: 環境毎の初期状態。
+        """
+        self.dones[:] = False
+        self._states = [env.reset() for env in self.envs]
+        return list(self._states)
+
+    def step(self, actions):
+        """
+        進行中の全環境を1ステップ進める。終了済みの環境は進めず、最後の状態を返す。
+
+        Args:
+            actions (list): 環境毎のアクション (action_type, tile)。終了済みの環境の要素は無視される。
+
+        Returns:
+            tuple: (環境毎の状態のリスト, 報酬の配列 (num_envs,), 終了フラグの配列 (num_envs,), 環境毎の追加情報のリスト)
+        """
+        rewards = np.zeros(self.num_envs, dtype=np.int32)
+        infos = [_EMPTY_INFO] * self.num_envs
+        envs, states, dones = self.envs, self._states, self.dones
+        for i in np.flatnonzero(~dones).tolist():
+            states[i], rewards[i], dones[i], infos[i] = envs[i].step(actions[i])
+        return list(states), rewards, dones.copy(), infos
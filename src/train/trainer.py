@@ -1,13 +1,13 @@
-import os
-import json
-import numpy as np
-import tensorflow as tf
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
 from src.agent.agent import MahjongAgent
 from src.env.mahjong_env import MahjongEnv
 from src.utils.vectorizer import MahjongVectorizer
 
+_LOG = logging.getLogger(__name__)
+
 
 class Trainer:
     """
@@ -26,10 +26,19 @@ class Trainer:
         self.num_agents = self.config['num_agents']
         self.rules = self.config.get('rules', {})
 
+        # 自己対戦中の各ゲームの結果はDEBUGログとして出力する。既定では書式化・出力とも行わず、
+        # logging.verbose_self_play を有効にした場合のみ出力する
+        if self.config.get('logging', {}).get('verbose_self_play', False):
+            logging.basicConfig()
+            _LOG.setLevel(logging.DEBUG)
+
         print(f"Initializing {self.num_agents} agents...")
-        self.agents = [
-            self._initialize_agent(i)
-            for i in range(self.num_agents)
+        # 自己対戦中の推論はモデルを読むだけなので、全エージェントで1つのモデルを共有する
+        # (エージェント毎にモデルを読み込んだり、重みを複製・同期したりしない)
+        first_agent = self._initialize_agent(0)
+        self.agents = [first_agent] + [
+            self._initialize_agent(i, shared_model=first_agent.model)
+            for i in range(1, self.num_agents)
         ]
 
         self.env = MahjongEnv(
@@ -38,12 +47,13 @@ class Trainer:
         )
         self.vectorizer = MahjongVectorizer()
 
-    def _initialize_agent(self, agent_id):
+    def _initialize_agent(self, agent_id, shared_model=None):
         """
         指定されたIDのエージェントを初期化する。
 
         Args:
             agent_id (int): エージェントのID。
+            shared_model (tf.keras.Model, optional): 共有するモデル。指定しない場合はモデルを読み込む。
 
         Returns:
             MahjongAgent: 初期化された麻雀エージェント。
@@ -54,7 +64,8 @@ class Trainer:
             agent_id=agent_id,
             model_dir=self.config['model']['model_save_dir'],
             base_model_name=self.config['model']['model_name'],
-            config=self.config
+            config=self.config,
+            shared_model=shared_model
         )
 
     def train(self):
@@ -65,19 +76,27 @@ class Trainer:
         # config.jsonの階層構造に合わせて修正
         total_games = self.config['training']['num_games']
         save_interval = self.config['model']['save_interval_games']
+        # モデルの保存はファイルI/Oが主で数秒かかることがあるため、自己対戦を止めないよう別スレッドで行う
+        # ワーカーを1つに限ることで、保存同士が重ならず、保存順も保たれる。train()の終了時に停止するため、呼び出し毎に作る
+        io_executor = ThreadPoolExecutor(max_workers=1)
+        pending_saves = []
+        # モデルの更新は各エージェントが経験をreplay_every件記憶する毎に1回行う。1ステップ毎の更新は小さなバッチでの起動コストが支配的になるため
+        # 手番は毎ステップ席を巡るため、全体で1つの計数にすると更新が特定の席に偏る。エージェント毎に数える
+        replay_every = self.config['training'].get('replay_every', 1)
+        steps_since_replay = [0] * self.num_agents
 
         for episode in tqdm(range(total_games), desc="Training Progress"):
             state = self.env.reset()
             done = False
             game_reward = 0
 
+            # 状態をベクトル化。以降は前ステップの次状態のベクトルを引き継ぎ、同じ状態を2度ベクトル化しない
+            state_vec = self.vectorizer.vectorize_state(state)
+
             while not done:
                 current_player_id = self.env.get_current_player_id()
                 agent = self.agents[current_player_id]
 
-                # 状態をベクトル化
-                state_vec = self.vectorizer.vectorize_state(state)
-
                 # 有効なアクションを取得
                 legal_actions = self.env.get_legal_actions()
 
@@ -93,23 +112,47 @@ class Trainer:
                 # エージェントに経験を記憶させる
                 agent.remember(state_vec, action, reward, next_state_vec, done)
 
-                state = next_state
+                state, state_vec = next_state, next_state_vec
                 game_reward += reward
 
                 # 定期的にエージェントのモデルを更新（学習）
-                agent.replay()
+                steps_since_replay[current_player_id] += 1
+                if steps_since_replay[current_player_id] >= replay_every:
+                    agent.replay()
+                    steps_since_replay[current_player_id] = 0
 
-            print(
-                f"Episode {episode + 1}/{total_games}, "
-                f"Total Reward: {game_reward}"
-            )
+            # 学習ループ内の標準出力はtqdmの進捗表示を乱し、I/Oコストもかかるためログに回す
+            if _LOG.isEnabledFor(logging.DEBUG):
+                _LOG.debug("Episode %d/%d, Total Reward: %s",
+                           episode + 1, total_games, game_reward)
 
             # 定期的にモデルを保存
             if self.config['model']['save_models'] and (episode + 1) % save_interval == 0:
+                # 前回までの保存で起きた例外は、学習の終了を待たずにここで送出する
+                pending_saves = self._check_finished_saves(pending_saves)
                 print(f"--- Saving models at episode {episode + 1} ---")
-                for agent in self.agents:
-                    # バージョン番号をエピソード数からゲーム数に変更
-                    agent.save_model(episode + 1)
-
+                # モデルは全エージェントで共有しているため、保存は1回でよい
+                # 重みはこの時点で同期的に複製して渡し、保存中の学習による更新が保存内容に混ざらないようにする
+                # バージョン番号をエピソード数からゲーム数に変更
+                first_agent = self.agents[0]
+                pending_saves.append(io_executor.submit(first_agent.save_model, episode + 1, first_agent.model.get_weights()))
+
+        # 実行中・待機中の保存が全て終わるまで待ち、保存中に起きた例外はここで送出する
+        io_executor.shutdown(wait=True)
+        for future in pending_saves:
+            future.result()
         print("\n--- Training finished ---")
 
+    @staticmethod
+    def _check_finished_saves(futures):
+        """
+        完了した保存の結果を確認し、未完了の保存のみを返す。保存中に例外が起きていた場合はそれを送出する。
+        """
+        remaining = []
+        for future in futures:
+            if future.done():
+                future.result()
+            else:
+                remaining.append(future)
+        return remaining
+
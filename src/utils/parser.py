@@ -6,17 +6,70 @@
 import xml.etree.ElementTree as ET
 import gzip
 import urllib.parse
+from bisect import insort
+import numpy as np
 from mahjong.shanten import Shanten
+from mahjong.agari import Agari
 from mahjong.tile import TilesConverter
 from mahjong.meld import Meld
+from mahjong.constants import EAST
 from mahjong.hand_calculating.hand_config import HandConfig, OptionalRules
 from mahjong.hand_calculating.hand import HandCalculator
 import os
+from src.constants import MAX_CONTEXT_LENGTH
+
+# 局・対局の終了を表すタグ、および他家の打牌に対する応答(鳴き・ロン)を表すタグ
+_ROUND_END_TAGS = frozenset(('AGARI', 'RYUUKYOKU', 'TAIKYOKU'))
+_RESPONSE_TAGS = frozenset(('N', 'AGARI'))
+# 席順の参照表。_NEXT_PLAYER[p]はpの下家、_OPPONENTS[p]はp以外の3人(席番号順)
+_NEXT_PLAYER = (1, 2, 3, 0)
+_OPPONENTS = tuple(tuple(q for q in range(4) if q != p) for p in range(4))
+# 牌種kの1枚分をhands_packedに加減するための値 (牌種毎に3ビット)
+_PACKED_UNIT = tuple(1 << 3 * k for k in range(34))
+# 門前手のシャンテン数のメモの上限件数。局・ファイルを跨いで保持するため、上限に達したら空にして使用メモリを抑える
+_SHANTEN_CACHE_LIMIT = 1 << 16
+# 牌種(34形式)毎の、チーで組み合わせる2枚の牌種の候補。字牌は空
+_CHII_PAIRS = tuple(
+    tuple((t + d1, t + d2) for d1, d2 in ((-2, -1), (-1, 1), (1, 2)) if t < 27 and 0 <= t + d1 and t + d2 < 27 and (t + d1) // 9 == (t + d2) // 9 == t // 9)
+    for t in range(34))
+
+class RoundState:
+    """
+    1局分の進行状態。局中の全処理から参照されるため、属性は__slots__で固定して辞書より高速に参照する。
+    """
+    __slots__ = ('events', 'round', 'honba', 'riichi_sticks', 'dora_indicators', 'scores', 'hands_136', 'hands_34', 'hands_packed', 'melds',
+                 'is_riichi', 'riichi_bits', 'open_bits', 'oya_player_id', 'last_drawn_tile', 'last_discarded_tile', 'pon_index')
+
+    def __init__(self):
+        self.events, self.round, self.honba, self.riichi_sticks, self.dora_indicators = [], 0, 0, 0, []
+        self.scores, self.hands_136, self.melds = np.full(4, 25000, dtype=np.int32), [[] for _ in range(4)], [[] for _ in range(4)]
+        self.hands_34 = [[0] * 34 for _ in range(4)]  # hands_136と同じ手牌の牌種毎の枚数。手牌の変更と同時に差分で更新する
+        self.hands_packed = [0] * 4  # hands_34を牌種毎に3ビットずつ詰めた整数。手牌の同一性を1つの整数で比較・ハッシュできる
+        self.is_riichi, self.riichi_bits = np.zeros(4, dtype=bool), 0  # riichi_bits: is_riichiと同じ内容のビットマスク(スカラー判定用)
+        self.open_bits = 0  # 副露(暗槓を除く)しているプレイヤーのビットマスク。門前判定で副露リストを走査しないために保持する
+        self.oya_player_id, self.last_drawn_tile, self.last_discarded_tile = 0, None, None
+        self.pon_index = [{} for _ in range(4)]  # プレイヤー毎の {ポンした牌種(34形式): melds内の位置}
+
+    def to_dict(self):
+        """
+        公開項目(INITイベントに記録する項目)を、以降の局の進行で変化しない複製として返す。
+        判定の高速化のために持つ内部状態(hands_34, hands_packed, riichi_bits, open_bits, pon_index)とイベント列は含めない。
+        """
+        return {
+            'round': self.round, 'honba': self.honba, 'riichi_sticks': self.riichi_sticks,
+            'dora_indicators': list(self.dora_indicators), 'scores': tuple(self.scores.tolist()),
+            'hands_136': [list(hand) for hand in self.hands_136], 'melds': [list(melds) for melds in self.melds],
+            'is_riichi': self.is_riichi.tolist(), 'oya_player_id': self.oya_player_id,
+            'last_drawn_tile': self.last_drawn_tile, 'last_discarded_tile': self.last_discarded_tile,
+        }
 
 class TransformerParser:
     def __init__(self):
         self.shanten_calculator = Shanten()
         self.hand_calculator = HandCalculator()
+        self.agari_checker = Agari()
+        # 門前手のシャンテン数のメモ。牌種構成(hands_packed)だけで決まるため、局・ファイルを跨いで再利用する (件数は_SHANTEN_CACHE_LIMITまで)
+        self._shanten_cache = {}
         self.reset_game_state()
 
     # --- 鳴き解析メソッド (全面改修・最終版) ---
@@ -31,10 +84,12 @@ class TransformerParser:
             TransformerParser._decode_chi(meld, meld_data)
         elif meld_data & (1 << 3): # Pon
             TransformerParser._decode_pon(meld, meld_data)
-        elif meld_data & (1 << 4): # Daiminkan
-             TransformerParser._decode_daiminkan(meld, meld_data)
-        elif meld_data & (1 << 5): # Kakan
+        elif meld_data & (1 << 4): # Kakan
             TransformerParser._decode_chakan(meld, meld_data)
+        elif meld_data & (1 << 5): # Nuki (三麻の北抜き。四麻では発生しないため未対応)
+            pass
+        elif meld_data & 0x3: # Daiminkan (鳴いた相手がいる槓)
+            TransformerParser._decode_daiminkan(meld, meld_data)
         else: # Ankan
             TransformerParser._decode_ankan(meld, meld_data)
         return meld
@@ -80,11 +135,12 @@ class TransformerParser:
         
     @staticmethod
     def _decode_daiminkan(meld, meld_data):
-        meld.type = Meld.DAIMINKAN
+        # ライブラリに大明槓専用の種類はないため、副露した槓(opened=True)として表す
+        meld.type = Meld.KAN
         meld.opened = True
         
-        tile_data = (meld_data >> 9) & 0x7F
-        tile_34 = tile_data // 3
+        tile_data = (meld_data >> 8) & 0xFF
+        tile_34 = tile_data // 4
         
         meld.tiles = [tile_34 * 4, tile_34 * 4 + 1, tile_34 * 4 + 2, tile_34 * 4 + 3]
         meld.called_tile = None
@@ -118,16 +174,20 @@ class TransformerParser:
     # --- 状態管理メソッド ---
     def reset_game_state(self):
         self.game_state = {'rules': {}, 'players': [''] * 4, 'config': HandConfig()}
+        # 和了判定用HandConfigのメモ。ルール(options)は対局毎に決まるため、対局の開始時とルール解析時に作り直す
+        self._config_cache = {}
         self.pending_my_turn_data = None
         self.pending_opponent_turn_data = None
         self.reset_round_state()
 
     def reset_round_state(self):
-        self.round_state = {
-            'events': [], 'round': 0, 'honba': 0, 'riichi_sticks': 0, 'dora_indicators': [],
-            'scores': [25000] * 4, 'hands_136': [[] for _ in range(4)], 'melds': [[] for _ in range(4)],
-            'is_riichi': [False] * 4, 'oya_player_id': 0, 'last_discarded_tile': None,
-        }
+        self.round_state = RoundState()
+        # イベント追加は局のイベントリストのappendを直接束縛し、メソッド呼び出しを経由しない
+        self._add_event = self.round_state.events.append
+        # 他家打牌時の選択肢のメモ。手牌が変わらない間は同じ牌種の打牌に対して結果が等しいため、局内で再利用する
+        self._opponent_actions_cache = {}
+        # 和了判定のメモ。役の有無は牌種の構成・和了牌の種類・ツモ/ロン・副露・リーチで決まり、赤ドラやドラ表示牌には依存しない
+        self._agari_cache = {}
         self.training_data = []
 
     # --- メインロジック (学習データ生成用) ---
@@ -215,14 +275,14 @@ class TransformerParser:
         elif tag == 'N': self._process_meld(attrib)
         elif tag == 'REACH': self._process_riichi(attrib)
         elif tag == 'DORA': self._add_event({'event_id': 'NEW_DORA', 'dora_indicator': int(attrib.get('hai'))})
-        elif tag in ['AGARI', 'RYUUKYOKU', 'TAIKYOKU']:
+        elif tag in _ROUND_END_TAGS:
             self.pending_my_turn_data, self.pending_opponent_turn_data = None, None
 
     # --- 学習データ生成用の詳細な処理 ---
     def _resolve_pending_actions(self, current_element):
         if self.pending_opponent_turn_data:
             acting_player, label = -1, "ACTION_PASS"
-            if current_element.tag in ['N', 'AGARI']:
+            if current_element.tag in _RESPONSE_TAGS:
                 acting_player = int(current_element.attrib.get('who'))
                 if current_element.tag == 'N':
                     meld_obj = self._decode_meld(int(current_element.attrib.get('m')))
@@ -243,71 +303,103 @@ class TransformerParser:
                 self._create_and_add_training_point(player, self.pending_my_turn_data["choices"], label)
                 self.pending_my_turn_data = None
 
-    def _add_event(self, event_dict): self.round_state['events'].append(event_dict)
     def _parse_rules(self, type_attr):
         val = int(type_attr)
         self.game_state['config'] = HandConfig(options=OptionalRules(has_open_tanyao=bool(val & 0x10), has_aka_dora=bool(val & 0x40)))
+        self._config_cache = {}
         return {'has_kuitan': bool(val & 0x10), 'has_aka_dora': bool(val & 0x40)}
     def _process_go(self, attrib): self._add_event({'event_id': 'GAME_START', 'rules': self._parse_rules(attrib.get('type'))})
     def _process_un(self, attrib): self.game_state['players'] = [urllib.parse.unquote(attrib.get(f'n{i}', '')) for i in range(4)]
     def _process_init(self, attrib):
         self.reset_round_state()
+        rs = self.round_state
         seed = [int(s) for s in attrib.get('seed').split(',')]
-        self.round_state.update({'round': seed[0], 'honba': seed[1], 'riichi_sticks': seed[2], 'dora_indicators': [seed[5]], 'oya_player_id': int(attrib.get('oya')), 'scores': [int(s) for s in attrib.get('ten').split(',')]})
-        for i in range(4): self.round_state['hands_136'][i] = sorted([int(p) for p in attrib.get(f'hai{i}').split(',') if p])
-        self._add_event({'event_id': 'INIT', **self.round_state})
+        rs.round, rs.honba, rs.riichi_sticks, rs.dora_indicators = seed[0], seed[1], seed[2], [seed[5]]
+        # tenは100点単位のため、点数に直して保持する (リーチ供託の1000点などと単位を揃える)
+        rs.oya_player_id, rs.scores = int(attrib.get('oya')), np.array([int(s) for s in attrib.get('ten').split(',')], dtype=np.int32) * 100
+        hands, hands_34 = rs.hands_136, rs.hands_34
+        for i in range(4):
+            hands[i] = sorted([int(p) for p in attrib.get(f'hai{i}').split(',') if p])
+            hands_34[i] = TilesConverter.to_34_array(hands[i])
+            rs.hands_packed[i] = sum(c * unit for c, unit in zip(hands_34[i], _PACKED_UNIT))
+        # 手牌・点数などは局中に更新されるため、局開始時点の値の複製を記録する
+        self._add_event({'event_id': 'INIT', **rs.to_dict()})
     def _process_draw(self, tag):
         player, tile = "TUVW".find(tag[0]), int(tag[1:])
-        self.round_state['hands_136'][player].append(tile); self.round_state['hands_136'][player].sort()
-        self.round_state['last_drawn_tile'] = tile
+        rs = self.round_state
+        hand = rs.hands_136[player]
+        insort(hand, tile)  # 手牌はソート済みのため、挿入位置を二分探索して1回の挿入で済ませる
+        rs.hands_34[player][tile // 4] += 1
+        rs.hands_packed[player] += _PACKED_UNIT[tile // 4]
+        rs.last_drawn_tile = tile
         self._add_event({'event_id': 'DRAW', 'player': player, 'tile': tile})
         self.pending_my_turn_data = {"player_pov": player, "choices": self._get_my_turn_actions(player, tile)}
     def _process_discard(self, tag):
         player, tile = "DEFG".find(tag[0]), int(tag[1:])
-        if tile in self.round_state['hands_136'][player]: self.round_state['hands_136'][player].remove(tile)
+        rs = self.round_state
+        hand = rs.hands_136[player]
+        if tile in hand:
+            hand.remove(tile)
+            rs.hands_34[player][tile // 4] -= 1
+            rs.hands_packed[player] -= _PACKED_UNIT[tile // 4]
         self._add_event({'event_id': 'DISCARD', 'player': player, 'tile': tile})
-        self.round_state['last_discarded_tile'] = tile
-        self.pending_opponent_turn_data = []
-        for p_idx in range(4):
-            if p_idx != player: self.pending_opponent_turn_data.append({"player_pov": p_idx, "choices": self._get_opponent_turn_actions(p_idx, player, tile)})
+        rs.last_discarded_tile = tile
+        # 見送りしか選べない他家は判断の余地がないため、学習データの候補として保留しない
+        get_actions = self._get_opponent_turn_actions
+        pending = []
+        for p_idx in _OPPONENTS[player]:
+            choices = get_actions(p_idx, player, tile)
+            if len(choices) > 1: pending.append({"player_pov": p_idx, "choices": choices})
+        self.pending_opponent_turn_data = pending
 
     def _process_meld(self, attrib):
         player, m = int(attrib.get('who')), int(attrib.get('m'))
         meld = self._decode_meld(m)
         if not meld.type: return
+        rs = self.round_state
+        hand, hand_34 = rs.hands_136[player], rs.hands_34[player]
 
         if meld.opened:
-            meld.called_tile = self.round_state['last_discarded_tile']
+            rs.open_bits |= 1 << player
+            if meld.type != Meld.CHANKAN: meld.called_tile = rs.last_discarded_tile
 
-        self.round_state['melds'][player].append(meld)
+        # 加槓は元のポンを置き換える。ポンの位置は牌種で索引しておき、副露リストを走査しない
+        melds, pon_index = rs.melds[player], rs.pon_index[player]
+        pon_position = pon_index.pop(meld.called_tile // 4, None) if meld.type == Meld.CHANKAN else None
+        if pon_position is not None: melds[pon_position] = meld
+        else: melds.append(meld)
+        if meld.type == Meld.PON: pon_index[meld.tiles[0] // 4] = len(melds) - 1
 
-        if meld.type == Meld.KAN: # Ankan
+        if meld.type == Meld.KAN and not meld.opened: # Ankan
             kan_tile_34 = meld.tiles[0] // 4
             count = 0
-            hand_copy = self.round_state['hands_136'][player][:]
-            for tile_in_hand in reversed(hand_copy):
+            for tile_in_hand in reversed(hand[:]):
                 if tile_in_hand // 4 == kan_tile_34 and count < 4:
-                    self.round_state['hands_136'][player].remove(tile_in_hand)
+                    hand.remove(tile_in_hand)
+                    hand_34[kan_tile_34] -= 1
                     count += 1
         
         elif meld.type == Meld.CHANKAN: # Kakan
             chakan_tile_34 = meld.called_tile // 4
-            for tile_in_hand in reversed(self.round_state['hands_136'][player]):
+            for tile_in_hand in reversed(hand):
                 if tile_in_hand // 4 == chakan_tile_34:
-                    self.round_state['hands_136'][player].remove(tile_in_hand)
+                    hand.remove(tile_in_hand)
+                    hand_34[chakan_tile_34] -= 1
                     break
         
         else: # Chi, Pon, Daiminkan
             # Remove tiles from hand that are part of the meld but not the called tile
             tiles_to_remove = [t for t in meld.tiles if t != meld.called_tile]
-            hand = self.round_state['hands_136'][player]
             for r_tile in tiles_to_remove:
                 # Find a matching tile in hand (ignoring specific ID, just type)
                 for h_tile in hand:
                     if h_tile // 4 == r_tile // 4:
                         hand.remove(h_tile)
+                        hand_34[h_tile // 4] -= 1
                         break
         
+        rs.hands_packed[player] = sum(c * unit for c, unit in zip(hand_34, _PACKED_UNIT))
+
         # After meld, it's this player's turn to discard
         self._add_event({'event_id': 'MELD', 'player': player, 'meld_code': m})
         self.pending_my_turn_data = {"player_pov": player, "choices": self._get_my_turn_actions(player, None)} # win_tile is None after meld
@@ -316,50 +408,99 @@ class TransformerParser:
         player, step = int(attrib.get('who')), int(attrib.get('step'))
         if step == 1 and self.pending_my_turn_data and self.pending_my_turn_data["player_pov"] == player: self.pending_my_turn_data['is_riichi_declared_this_turn'] = True
         elif step == 2:
-            self.round_state['is_riichi'][player] = True
-            self.round_state['scores'][player] -= 1000
-            self.round_state['riichi_sticks'] += 1
+            rs = self.round_state
+            rs.is_riichi[player] = True
+            rs.riichi_bits |= 1 << player
+            rs.scores[player] -= 1000
+            rs.riichi_sticks += 1
     def _create_and_add_training_point(self, pov, choices, label):
-        if choices and label in choices: self.training_data.append({"context": self.round_state['events'].copy(), "choices": choices, "label": label, "player_pov": pov})
+        # モデルが参照するのは直近MAX_CONTEXT_LENGTH件のイベントのみのため、局全体ではなくその範囲だけを複製する
+        if choices and label in choices: self.training_data.append({"context": self.round_state.events[-MAX_CONTEXT_LENGTH:], "choices": choices, "label": label, "player_pov": pov})
     def _get_my_turn_actions(self, p_idx, win_tile):
-        actions, hand = [], self.round_state['hands_136'][p_idx]
-        unique_tiles = sorted(list(set(hand)))
-        for t in unique_tiles: actions.append(f"DISCARD_{t}")
-        if win_tile is not None and self._can_agari(hand, win_tile, True, p_idx): actions.append("ACTION_TSUMO_AGARI")
-        try: shanten = self.shanten_calculator.calculate_shanten(TilesConverter.to_34_array(hand))
-        except: shanten = 9
-        if shanten == 0 and not self.round_state['is_riichi'][p_idx]:
-            for t in unique_tiles:
-                temp_hand = hand.copy(); temp_hand.remove(t)
-                try:
-                    if self.shanten_calculator.calculate_shanten(TilesConverter.to_34_array(temp_hand)) == 0: actions.append(f"ACTION_RIICHI_{t}")
-                except: continue
-        return list(dict.fromkeys(actions))
+        rs = self.round_state
+        hand = rs.hands_136[p_idx]
+        hand_34, packed = rs.hands_34[p_idx], rs.hands_packed[p_idx]
+        # 136形式の牌IDは1枚毎に一意で、手牌は常にソート済みのため、手牌そのものが重複のない昇順の打牌候補になる
+        actions = [f"DISCARD_{t}" for t in hand]
+        # 門前かつ未リーチの手(対局の大半の手番)は、シャンテン数1回で以降の判定の要否を決める
+        # 和了形は-1となるため、1以上ならツモ和了判定・打牌毎のリーチ判定をともに省いて打牌のみを返す
+        if not (rs.riichi_bits | rs.open_bits) >> p_idx & 1:
+            shanten = self._closed_shanten(packed, hand_34)
+            if shanten > 0: return actions
+            if shanten < 0 and win_tile is not None and self._can_agari(hand, hand_34, packed, win_tile, True, p_idx): actions.append("ACTION_TSUMO_AGARI")
+        else:
+            if win_tile is not None and self._can_agari(hand, hand_34, packed, win_tile, True, p_idx): actions.append("ACTION_TSUMO_AGARI")
+            return actions
+        # 和了形(-1)でもツモ和了を見送って聴牌を保つ打牌でリーチできるため、0以下を対象とする
+        # 同種牌(赤ドラ含む)は打牌後のシャンテン数が等しいため、牌種ごとに一度だけ計算する
+        # 打牌後の手は34形式の枚数を一時的に1減らして表し、手牌の複製と再変換を省く。メモのキーも詰めた整数から引くだけで求まる
+        tenpai_after_discard = {}
+        for t in hand:
+            tile_34 = t // 4
+            if tile_34 not in tenpai_after_discard:
+                hand_34[tile_34] -= 1
+                tenpai_after_discard[tile_34] = self._closed_shanten(packed - _PACKED_UNIT[tile_34], hand_34) == 0
+                hand_34[tile_34] += 1
+            if tenpai_after_discard[tile_34]: actions.append(f"ACTION_RIICHI_{t}")
+        # 打牌・リーチは重複のない牌IDから、その他は各1回だけ生成されるため、重複除去は不要
+        return actions
+    def _closed_shanten(self, packed, hand_34):
+        # packedはhand_34を詰めた整数。同じ構成の手は局・ファイルを跨いで繰り返し現れるため、計算結果を使い回す
+        cache = self._shanten_cache
+        shanten = cache.get(packed)
+        if shanten is None:
+            if len(cache) >= _SHANTEN_CACHE_LIMIT: cache.clear()
+            shanten = cache[packed] = self.shanten_calculator.calculate_shanten(hand_34)
+        return shanten
     def _get_opponent_turn_actions(self, p_idx, discarder, tile):
-        actions, hand = ["ACTION_PASS"], self.round_state['hands_136'][p_idx]
-        if self._can_agari(hand + [tile], tile, False, p_idx): actions.append("ACTION_RON_AGARI")
-        counts, tile_34 = TilesConverter.to_34_array(hand), tile // 4
+        rs = self.round_state
+        hand, tile_34, is_kamicha = rs.hands_136[p_idx], tile // 4, _NEXT_PLAYER[discarder] == p_idx
+        # 手牌は牌種構成を詰めた整数で表す (赤ドラの有無は鳴き・和了の可否に影響しない)
+        key = (p_idx, tile_34, is_kamicha, rs.hands_packed[p_idx], len(rs.melds[p_idx]), rs.riichi_bits >> p_idx & 1)
+        cached = self._opponent_actions_cache.get(key)
+        if cached is not None: return list(cached)
+        actions, counts = ["ACTION_PASS"], rs.hands_34[p_idx]
+        # ロン判定は3人の他家それぞれで行われるため、手牌の複製は作らず、枚数を一時的に1増やして判定する
+        counts[tile_34] += 1
+        can_ron = self._can_agari(hand, counts, rs.hands_packed[p_idx] + _PACKED_UNIT[tile_34], tile, False, p_idx)
+        counts[tile_34] -= 1
+        if can_ron: actions.append("ACTION_RON_AGARI")
         if counts[tile_34] >= 2: actions.append("ACTION_PUNG")
-        if (discarder + 1) % 4 == p_idx and tile_34 < 27:
-            for p in [[-2,-1],[-1,1],[1,2]]:
-                t1,t2 = tile_34+p[0], tile_34+p[1]
-                if t1>=0 and t2<27 and t1//9==t2//9==tile_34//9 and counts[t1]>0 and counts[t2]>0: actions.append(f"ACTION_CHII_{min(t1,t2)}_{max(t1,t2)}")
+        if is_kamicha:
+            for t1, t2 in _CHII_PAIRS[tile_34]:
+                if counts[t1] and counts[t2]: actions.append(f"ACTION_CHII_{t1}_{t2}")
         if counts[tile_34] >= 3: actions.append("ACTION_DAIMINKAN")
-        return list(dict.fromkeys(actions))
+        self._opponent_actions_cache[key] = tuple(actions)
+        return actions
     def _get_config(self, is_tsumo, p_idx):
-        return HandConfig(is_tsumo=is_tsumo, is_riichi=self.round_state['is_riichi'][p_idx], player_wind=Meld.EAST + ((p_idx-self.round_state['oya_player_id']+4)%4), round_wind=Meld.EAST + self.round_state['round']//4, options=self.game_state['config'].options)
-    def _can_agari(self, hand, win_tile, is_tsumo, p_idx):
-        try:
-            res = self.hand_calculator.estimate_hand_value(hand, win_tile, melds=self.round_state['melds'][p_idx], dora_indicators=self.round_state['dora_indicators'], config=self._get_config(is_tsumo, p_idx))
-            return res.error is None
-        except: return False
+        rs = self.round_state
+        key = (is_tsumo, rs.riichi_bits >> p_idx & 1, (p_idx - rs.oya_player_id) & 3, rs.round//4)
+        config = self._config_cache.get(key)
+        if config is None: config = self._config_cache[key] = HandConfig(is_tsumo=is_tsumo, is_riichi=bool(key[1]), player_wind=EAST + key[2], round_wind=EAST + key[3], options=self.game_state['config'].options)
+        return config
+    def _can_agari(self, hand, hand_34, packed, win_tile, is_tsumo, p_idx):
+        # hand_34・packedは和了牌を含む構成。handはロンの場合のみ和了牌を含まず、点数計算が必要になった時だけ和了牌を加える
+        rs = self.round_state
+        key = (p_idx, packed, win_tile // 4, is_tsumo, len(rs.melds[p_idx]), rs.riichi_bits >> p_idx & 1)
+        cached = self._agari_cache.get(key)
+        if cached is None:
+            # 点数計算(HandConfig生成を含む)は和了形の場合のみ行う。副露牌は手牌に含まれないため、手牌だけで和了形か判定できる
+            is_complete = self.agari_checker.is_agari(hand_34)
+            cached = self._agari_cache[key] = is_complete and self._estimate_agari(hand if is_tsumo else hand + [win_tile], win_tile, is_tsumo, p_idx)
+        return cached
+    def _estimate_agari(self, hand, win_tile, is_tsumo, p_idx):
+        rs = self.round_state
+        melds = rs.melds[p_idx]
+        # estimate_hand_valueは副露牌を含む手牌全体を要求する。槓子は4枚目を除いた3枚で数える
+        if melds: hand = hand + [t for m in melds for t in m.tiles[:3]]
+        res = self.hand_calculator.estimate_hand_value(hand, win_tile, melds=melds, dora_indicators=rs.dora_indicators, config=self._get_config(is_tsumo, p_idx))
+        return res.error is None
     def _meld_obj_to_action_label(self, meld):
         if meld.type == Meld.CHI:
             # called_tileは実際の牌ID、meld.tilesは暫定IDなので、種類(//4)で比較する
             tiles = sorted([t//4 for t in meld.tiles if t//4 != meld.called_tile//4])
             return f"ACTION_CHII_{tiles[0]}_{tiles[1]}"
         elif meld.type == Meld.PON: return "ACTION_PUNG"
-        elif meld.type == Meld.DAIMINKAN: return "ACTION_DAIMINKAN"
-        elif meld.type == Meld.KAN: return "ACTION_ANKAN"
+        elif meld.type == Meld.KAN: return "ACTION_DAIMINKAN" if meld.opened else "ACTION_ANKAN"
         elif meld.type == Meld.CHANKAN: return "ACTION_KAKAN"
         return "UNKNOWN"
\ No newline at end of file
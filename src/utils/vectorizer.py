@@ -1,47 +1,118 @@
 import numpy as np
-from src.constants import VECTOR_DIM
+from functools import lru_cache
+from src.constants import VECTOR_DIM, MAX_CONTEXT_LENGTH, MAX_CHOICES, ACTION_LABEL_TO_TYPE
 
-# --- 以前から必要だった関数 (placeholderとして追加) ---
+# --- イベント・選択肢のベクトル化 (doc/model_architecture.md「4. 入力データのベクトル化仕様」) ---
 
+# イベントID (vec[0])。TransformerParserが出力するevent_idを数値に対応させる。0は未知のイベント
+_EVENT_IDS = {"GAME_START": 1, "INIT": 2, "DRAW": 3, "DISCARD": 4, "MELD": 5, "NEW_DORA": 6}
 
-def vectorize_event(event):
+# 視点の席毎に、自分から順に並べた席の表。点数などを相対席の順に並べる際に、毎回剰余を計算せずに引く
+_POV_SEATS = tuple(tuple((pov + i) & 3 for i in range(4)) for pov in range(4))
+
+# 選択肢の種類 (vec[0])
+_CHOICE_DISCARD, _CHOICE_ACTION = 1, 2
+
+
+def _prepare_out(out):
+    """書き込み先のベクトルを返す。outが指定されていればゼロで埋めて使い回し、なければ新たに確保する"""
+    if out is None:
+        return np.zeros(VECTOR_DIM, dtype=np.float32)
+    out.fill(0)
+    return out
+
+
+def vectorize_event(event, player_pov, out=None):
     """
-    ゲームのイベントをベクトルに変換する。
-    注意: これは基本的なプレースホルダー実装です。
+    TransformerParserが出力したイベントをベクトルに変換する。
+    プレイヤーと点数は、player_povの席を0とした相対席で表す。
+    outに長さVECTOR_DIMの配列 (コンテキスト行列の1行など) を渡した場合は、新たに確保せずそこへ書き込む。
     """
-    # ここではイベントの種類を単純なインデックスに変換する例
-    event_type_map = {"draw": 0, "discard": 1, "pon": 2, "chi": 3, "kan": 4}
-    vector = np.zeros(VECTOR_DIM)
-    event_type = event.get("type", "unknown")
-    if event_type in event_type_map:
-        vector[event_type_map[event_type]] = 1
-    # 本来は牌の情報などもベクトルに含める必要がある
+    return _write_event(event, player_pov, _prepare_out(out))
+
+
+def _write_event(event, player_pov, vector):
+    """イベントの特徴量を、ゼロで初期化済みのvectorに書き込む。書き込むのはイベントが持つ項目の要素のみ"""
+    vector[0] = _EVENT_IDS.get(event.get("event_id"), 0)
+    player = event.get("player")
+    if player is not None:
+        vector[1] = (player - player_pov) & 3
+    tile = event.get("tile")
+    if tile is not None:
+        vector[10] = tile
+    # 点数・供託・ドラ表示牌は局の開始 (INIT) のみが持つ。新ドラ (NEW_DORA) はドラ表示牌のみ
+    scores = event.get("scores")
+    if scores is not None:
+        vector[3:7] = [(scores[seat] - 25000) / 10000.0 for seat in _POV_SEATS[player_pov]]
+        vector[7] = event.get("riichi_sticks", 0)
+    if event.get("dora_indicators"):
+        vector[12] = event["dora_indicators"][0]
+    elif "dora_indicator" in event:
+        vector[12] = event["dora_indicator"]
     return vector
 
 
-def vectorize_choice(choice):
+@lru_cache(maxsize=None)
+def _parse_choice(choice):
+    """
+    選択肢の文字列を (種類, 牌ID/アクションID, 詳細1, 詳細2) に分解する。
+    選択肢の文字列は牌IDと鳴きの組み合わせで種類が限られ、対局を跨いで繰り返し現れるため、結果を使い回す。
+    """
+    if choice.startswith("DISCARD_"):
+        return _CHOICE_DISCARD, int(choice[8:]), 0, 0
+    # ACTION_<種類>[_詳細1[_詳細2]]。種類自体が"_"を含む (TSUMO_AGARIなど) ため、末尾の数値部分を詳細とする
+    parts = choice[len("ACTION_"):].split("_")
+    details = []
+    while parts[-1].isdigit():
+        details.insert(0, int(parts.pop()))
+    details += [0, 0]
+    return _CHOICE_ACTION, int(ACTION_LABEL_TO_TYPE.get("_".join(parts), 0)), details[0], details[1]
+
+
+def vectorize_choice(choice, out=None):
     """
-    選択肢（アクション）をベクトルに変換する。
-    注意: これは基本的なプレースホルダー実装です。
+    選択肢の文字列 (DISCARD_8, ACTION_RIICHI_24, ACTION_CHII_8_12 など) をベクトルに変換する。
+    vec[0]が種類 (打牌1, アクション2)、vec[1]が牌IDまたはアクションID、vec[2], vec[3]がアクションの詳細
+    (リーチの打牌、チーに使う2枚など)。
+    outに長さVECTOR_DIMの配列 (選択肢行列の1行など) を渡した場合は、新たに確保せずそこへ書き込む。
     """
-    # ここでは選択肢の種類を単純なインデックスに変換する例
-    # event_type_mapとインデックスが被らないように値を設定
-    choice_type_map = {
-        "discard": 10, "pon": 11, "chi": 12, "kan": 13, "tsumo": 14
-    }
-    vector = np.zeros(VECTOR_DIM)
-    choice_type = choice.get("type", "unknown")
-    if choice_type in choice_type_map:
-        vector[choice_type_map[choice_type]] = 1
-    # 本来はどの牌を対象とするかなどの情報もベクトルに含める必要がある
+    vector = _prepare_out(out)
+    vector[0:4] = _parse_choice(choice)
     return vector
 
-# --- 新しく追加したクラス ---
+
+def vectorize_decision(events, choices, player_pov):
+    """
+    1回の判断を、モデルの3つの入力 (context, choices, mask) に変換する (doc/model_architecture.md)。
+    各イベント・選択肢は、事前に確保した行列の行へ直接書き込む。
+    行列はnp.zerosで確保した時点でゼロのため、行毎にゼロで埋め直さず、イベント・選択肢が持つ要素のみを書き込む。
+
+    Args:
+        events (list): 過去のイベント。古いものはMAX_CONTEXT_LENGTH件を超えた分だけ切り捨てる。
+        choices (list): 選択肢の文字列。MAX_CHOICES件を超えた分は切り捨てる。
+        player_pov (int): 判断するプレイヤーの席。
+
+    Returns:
+        tuple: ((MAX_CONTEXT_LENGTH, VECTOR_DIM)のコンテキスト, (MAX_CHOICES, VECTOR_DIM)の選択肢, (MAX_CHOICES,)のマスク)。
+    """
+    context = np.zeros((MAX_CONTEXT_LENGTH, VECTOR_DIM), dtype=np.float32)
+    for row, event in zip(context, events[-MAX_CONTEXT_LENGTH:]):
+        _write_event(event, player_pov, row)
+    choices = choices[:MAX_CHOICES]
+    choice_matrix = np.zeros((MAX_CHOICES, VECTOR_DIM), dtype=np.float32)
+    if choices:
+        choice_matrix[:len(choices), 0:4] = [_parse_choice(choice) for choice in choices]
+    mask = np.zeros(MAX_CHOICES, dtype=np.float32)
+    mask[:len(choices)] = 1.0
+    return context, choice_matrix, mask
+
+# --- 強化学習環境の状態のベクトル化 ---
 
 
 class MahjongVectorizer:
     """
-    麻雀のゲーム状態全体をベクトル表現に変換するクラス。
+    MahjongEnvのゲーム状態全体をベクトル表現に変換するクラス。
+    イベントのベクトルと同じく、席毎の特徴量は手番のプレイヤーを0とした相対席の順に並べる。
     """
 
     def __init__(self):
@@ -53,51 +124,66 @@ class MahjongVectorizer:
     def vectorize_state(self, state):
         """
         与えられたゲーム状態を固定長のベクトルに変換する。
-        注意: これは基本的なプレースホルダー実装です。
-               実際のプロジェクトでは、状態の各要素を
-               より洗練された方法でエンコードする必要があります。
 
         Args:
-            state (dict): ゲームの状態を表す辞書。
+            state (dict): MahjongEnv._get_state() が返すゲームの状態を表す辞書。
 
         Returns:
             np.array: 状態を表すベクトル。
         """
         if state is None:
             # ゲーム開始前など、状態がNoneの場合
-            return np.zeros(self.vector_dim)
+            return np.zeros(self.vector_dim, dtype=np.float32)
 
-        # 簡単な実装例：状態の辞書から数値情報を抽出し、
-        # 連結して固定長のベクトルを生成する。
-        # 本来は、牌の種類、ドラ、捨て牌などをone-hotエンコーディングすべき。
-
-        feature_vector = []
-
-        # プレイヤーの手牌 (牌の数を特徴量とする)
-        for player_hand in state.get('hands', [[] for _ in range(4)]):
-            feature_vector.append(len(player_hand))
-
-        # 捨て牌 (牌の数を特徴量とする)
-        for player_discards in state.get('discards', [[] for _ in range(4)]):
-            feature_vector.append(len(player_discards))
-
-        # ドラ表示牌 (単純な数値として追加)
-        feature_vector.append(state.get('dora_indicator', 0))
-
-        # 現在のターン
-        feature_vector.append(state.get('turn', 0))
+        vector = np.zeros(self.vector_dim, dtype=np.float32)
+        self._write_state(state, vector)
+        return vector
 
-        # NumPy配列に変換
-        features = np.array(feature_vector, dtype=np.float32)
+    def vectorize_batch(self, states):
+        """
+        複数の環境のゲーム状態をまとめてベクトル化する。
+        VectorMahjongEnvのように複数の環境を同時に進める場合に、推論へ渡すバッチを1つの配列に直接書き込んで作る。
 
-        # 固定長のベクトルになるようにパディングまたは切り捨て
-        if len(features) > self.vector_dim:
-            # ベクトル次元数に合わせて切り捨て
-            vector = features[:self.vector_dim]
-        else:
-            # 足りない部分をゼロで埋める (ゼロパディング)
-            vector = np.pad(features, (0, self.vector_dim - len(features)),
-                            'constant')
+        Args:
+            states (list): ゲームの状態を表す辞書のリスト。Noneの要素はゼロベクトルになる。
 
-        return vector
+        Returns:
+            np.ndarray: (len(states), vector_dim) の配列。
+        """
+        batch = np.zeros((len(states), self.vector_dim), dtype=np.float32)
+        for row, state in zip(batch, states):
+            if state is not None:
+                self._write_state(state, row)
+        return batch
 
+    def _write_state(self, state, out):
+        """
+        ゲーム状態の特徴量を、ゼロで初期化済みの長さvector_dimの配列outに書き込む。
+        インデックスはイベントのベクトルと揃えている。
+
+        | インデックス | 内容 |
+        |---|---|
+        | out[2] | 巡目 (30.0で除算) |
+        | out[3-6] | 各プレイヤーの点数 ((点数 - 25000) / 10000、手番のプレイヤーから順に) |
+        | out[8] | 山の残り枚数 (70.0で除算) |
+        | out[12] | ドラ表示牌ID |
+        | out[13-16] | 各プレイヤーのリーチの有無 |
+        | out[17-20] | 各プレイヤーの捨て牌の数 |
+        | out[21-24] | 各プレイヤーの副露の数 |
+        | out[30-63] | 手番のプレイヤーの手牌 (34形式の牌種毎の枚数) |
+
+        他家の手牌は見えない情報のため、枚数は手番のプレイヤーの分のみ書き込む。
+        """
+        players = state['players']
+        out[2] = state['turn'] / 30.0
+        out[8] = state['deck_size'] / 70.0
+        if state['dora_indicators']:
+            out[12] = state['dora_indicators'][0]
+        current = state['current_player_id']
+        out[30:64] = players[current]['hand_34']
+        for i, seat in enumerate(_POV_SEATS[current]):
+            player = players[seat]
+            out[3 + i] = (player['score'] - 25000) / 10000.0
+            out[13 + i] = player['riichi']
+            out[17 + i] = len(player['discards'])
+            out[21 + i] = len(player['melds'])
@@ -0,0 +1,8 @@
+import pytest
+from mahjong.hand_calculating.hand import HandCalculator
+
+
+@pytest.fixture(scope="session")
+def calculator():
+    """点数計算を行うHandCalculator。状態を持たないため、全てのテストで1つのインスタンスを共有する"""
+    return HandCalculator()
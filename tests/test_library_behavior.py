@@ -12,7 +12,6 @@
 """
 import pytest
 from mahjong.tile import TilesConverter
-from mahjong.hand_calculating.hand import HandCalculator
 from mahjong.hand_calculating.hand_config import HandConfig
 from mahjong.constants import EAST, SOUTH
 from mahjong.shanten import Shanten
@@ -22,12 +21,11 @@ from mahjong.meld import Meld
 # Section 1: HandCalculator（点数計算）の基本的な挙動調査
 # ===============================================================================
 
-def test_yakunashi_tenpai():
+def test_yakunashi_tenpai(calculator):
     """
     役無し聴牌の状態でアガろうとした場合に、ライブラリが正しくエラーを返すか調査します。
     """
     print("\n--- Running Test: Yakunashi Tenpai (No Yaku) ---")
-    calculator = HandCalculator()
 
     # 手牌: 234m 567p 88s, 鳴き: [123s] -> 待ち: 7s, 9s
     # 1sを鳴いているためタンヤオにならず、他の役もない。
@@ -0,0 +1,102 @@
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+from src.utils import parser as parser_module
+from mahjong.meld import Meld
+from src.utils.parser import TransformerParser
+
+def _init_tag(ten='250,250,250,250', oya=0):
+    """配牌が席順に0-51の牌IDとなるINITタグを作る"""
+    return ET.Element('INIT', {'seed': '0,0,0,2,3,52', 'ten': ten, 'oya': str(oya),
+                               **{f'hai{i}': ','.join(str(t) for t in range(i * 13, (i + 1) * 13)) for i in range(4)}})
+
+class TestTransformerParser(unittest.TestCase):
+    def test_init_event_is_a_snapshot_of_public_fields(self):
+        """INITイベントが局の進行で書き換わらず、内部状態を含まないかテスト"""
+        parser = TransformerParser()
+        parser.process_tag(ET.Element('GO', {'type': '169'}))
+        parser.process_tag(_init_tag())
+        init = parser.round_state.events[-1]
+        for key in ('hands_34', 'hands_packed', 'riichi_bits', 'open_bits', 'pon_index', 'events'):
+            self.assertNotIn(key, init)
+        hand_0 = list(init['hands_136'][0])
+
+        for tag in (ET.Element('T100'), ET.Element('D0'), ET.Element('REACH', {'who': '0', 'step': '1'}),
+                    ET.Element('D100'), ET.Element('REACH', {'who': '0', 'step': '2'})):
+            parser.process_tag(tag)
+
+        self.assertEqual(init['hands_136'][0], hand_0)
+        self.assertEqual(init['scores'], (25000, 25000, 25000, 25000))
+        self.assertEqual(init['is_riichi'], [False] * 4)
+        self.assertEqual(parser.round_state.scores[0], 24000)
+    def test_shanten_cache_is_bounded(self):
+        """局・ファイルを跨いで保持するシャンテン数のメモが、上限件数を超えて増えないかテスト"""
+        parser = TransformerParser()
+        with mock.patch.object(parser_module, '_SHANTEN_CACHE_LIMIT', 3):
+            for game in range(3):
+                parser.reset_game_state()
+                parser.process_tag(ET.Element('GO', {'type': '169'}))
+                parser.process_tag(_init_tag(oya=game))
+                for tile in (100 + game, 110 + game, 120 + game):
+                    parser.process_tag(ET.Element('TUVW'[game] + str(tile)))
+                    parser.process_tag(ET.Element('DEFG'[game] + str(tile)))
+                    self.assertLessEqual(len(parser._shanten_cache), 3)
+        self.assertTrue(parser._shanten_cache)
+
+class TestDecodeMeld(unittest.TestCase):
+    """天鳳の副露コード(m属性)の解析をテストする。コードは各鳴きのビット配置に従って組み立てる"""
+
+    def decode(self, m):
+        meld = TransformerParser._decode_meld(m)
+        label = TransformerParser._meld_obj_to_action_label(TransformerParser(), meld) if meld.type else None
+        return meld, label
+
+    def test_chi(self):
+        # 345mの3mを鳴いたチー: 上位6ビットが (基準牌種2) * 3 + 鳴いた牌の位置0、bit2がチー
+        meld, label = self.decode((2 * 3 + 0) << 10 | 1 << 2)
+        self.assertEqual(meld.type, Meld.CHI)
+        self.assertTrue(meld.opened)
+        self.assertEqual(meld.tiles, [8, 12, 16])
+        self.assertEqual(meld.called_tile, 8)
+        self.assertEqual(label, "ACTION_CHII_3_4")
+
+    def test_pon(self):
+        # 5pのポン: bit9以降が 牌種13 * 3 + 鳴いた牌の位置、bit5-6が使わなかった1枚(53)、bit3がポン
+        meld, label = self.decode((13 * 3) << 9 | 1 << 5 | 1 << 3)
+        self.assertEqual(meld.type, Meld.PON)
+        self.assertTrue(meld.opened)
+        self.assertEqual(meld.tiles, [52, 54, 55])
+        self.assertEqual(label, "ACTION_PUNG")
+
+    def test_kakan(self):
+        # 5pの加槓: ポンと同じ配置で、bit5-6が加えた1枚(54)、bit4が加槓
+        meld, label = self.decode((13 * 3) << 9 | 2 << 5 | 1 << 4)
+        self.assertEqual(meld.type, Meld.CHANKAN)
+        self.assertEqual(meld.tiles, [52, 53, 54, 55])
+        self.assertEqual(meld.called_tile, 54)
+        self.assertEqual(label, "ACTION_KAKAN")
+
+    def test_daiminkan(self):
+        # 8sの大明槓: bit8以降が牌ID(100)、下位2ビットが鳴いた相手(下家から1)
+        meld, label = self.decode(100 << 8 | 1)
+        self.assertEqual(meld.type, Meld.KAN)
+        self.assertTrue(meld.opened)
+        self.assertEqual(meld.tiles, [100, 101, 102, 103])
+        self.assertEqual(label, "ACTION_DAIMINKAN")
+
+    def test_ankan(self):
+        # 8sの暗槓: 大明槓と同じ配置で、鳴いた相手が0
+        meld, label = self.decode(100 << 8)
+        self.assertEqual(meld.type, Meld.KAN)
+        self.assertFalse(meld.opened)
+        self.assertEqual(meld.tiles, [100, 101, 102, 103])
+        self.assertEqual(label, "ACTION_ANKAN")
+
+    def test_nuki_is_ignored(self):
+        # 北抜き (bit5) は四麻では発生しないため、種類を持たない副露として読み飛ばされる
+        meld, label = self.decode(30 << 8 | 1 << 5)
+        self.assertIsNone(meld.type)
+        self.assertIsNone(label)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import random
+import unittest
+import xml.etree.ElementTree as ET
+from mahjong.tile import TilesConverter
+from src.utils.parser import TransformerParser, _PACKED_UNIT
+
+
+def _random_game(seed):
+    """
+    無作為な対局のタグ列を作る。ツモ・打牌・リーチ・新ドラ・ポン・チーを含む。
+    奇数のシードでは配牌を順子中心にして聴牌・和了形を増やし、リーチ・和了判定の経路も通るようにする。
+    """
+    rng = random.Random(seed)
+    tags = [('GO', {'type': '169'}), ('UN', {f'n{i}': f'p{i}' for i in range(4)})]
+    for rnd in range(2):
+        wall = list(range(136))
+        rng.shuffle(wall)
+        hands = []
+        for _ in range(4):
+            hand = []
+            while seed % 2 and len(hand) < 12:
+                base = rng.randrange(3) * 9 + rng.randrange(7)
+                run = [next((t for t in wall if t // 4 == k), None) for k in (base, base + 1, base + 2)]
+                if None in run: continue
+                for t in run: wall.remove(t)
+                hand += run
+            while len(hand) < 13: hand.append(wall.pop())
+            hands.append(hand)
+        oya = rnd % 4
+        tags.append(('INIT', {'seed': f'{rnd},0,0,1,2,{wall.pop()}', 'ten': '250,250,250,250', 'oya': str(oya),
+                              **{f'hai{i}': ','.join(map(str, sorted(hands[i]))) for i in range(4)}}))
+        cur, riichi, skip_draw = oya, [False] * 4, False
+        for _ in range(70):
+            if not wall: break
+            if not skip_draw:
+                t = wall.pop()
+                hands[cur].append(t)
+                tags.append(('TUVW'[cur] + str(t), {}))
+            skip_draw = False
+            declare = not riichi[cur] and rng.random() < 0.05
+            if declare: tags.append(('REACH', {'who': str(cur), 'step': '1'}))
+            d = hands[cur][-1] if riichi[cur] else rng.choice(hands[cur])
+            hands[cur].remove(d)
+            tags.append(('DEFG'[cur] + str(d), {}))
+            if declare:
+                tags.append(('REACH', {'who': str(cur), 'step': '2'}))
+                riichi[cur] = True
+            if rng.random() < 0.02 and wall: tags.append(('DORA', {'hai': str(wall.pop())}))
+            d34, caller = d // 4, None
+            # ポン: 打牌者以外で同じ牌種を2枚持つ未リーチの者
+            for off in (2, 3, 1):
+                p = (cur + off) % 4
+                same = [t for t in hands[p] if t // 4 == d34]
+                if len(same) >= 2 and not riichi[p] and rng.random() < 0.4:
+                    unused = next(t for t in range(d34 * 4, d34 * 4 + 4) if t != d and t not in same[:2]) - d34 * 4
+                    tags.append(('N', {'who': str(p), 'm': str((d34 * 3) << 9 | unused << 5 | 1 << 3)}))
+                    for t in same[:2]: hands[p].remove(t)
+                    caller = p
+                    break
+            # チー: 下家が順子の残り2枚を持つ場合
+            nxt = (cur + 1) % 4
+            if caller is None and d34 < 27 and not riichi[nxt] and rng.random() < 0.4:
+                for base in (d34 - 2, d34 - 1, d34):
+                    if base < 0 or base // 9 != d34 // 9 or base % 9 > 6: continue
+                    others = [next((t for t in hands[nxt] if t // 4 == k), None) for k in (base, base + 1, base + 2) if k != d34]
+                    if None in others: continue
+                    tags.append(('N', {'who': str(nxt), 'm': str(((base // 9 * 7 + base % 9) * 3 + d34 - base) << 10 | 1 << 2)}))
+                    for t in others: hands[nxt].remove(t)
+                    caller = nxt
+                    break
+            if caller is not None:
+                cur, skip_draw = caller, True
+            else:
+                cur = (cur + 1) % 4
+        tags.append(('RYUUKYOKU', {}))
+    return tags
+
+
+class _UncachedParser(TransformerParser):
+    """全てのメモをタグ毎に空にし、毎回計算し直すパーサー (メモを使った場合の結果と比較する基準)"""
+    def process_tag(self, element, is_debug=False):
+        self._shanten_cache.clear()
+        self._config_cache.clear()
+        self._opponent_actions_cache.clear()
+        self._agari_cache.clear()
+        super().process_tag(element, is_debug)
+
+
+class TestParserCacheConsistency(unittest.TestCase):
+    def assert_hand_counts_consistent(self, parser):
+        rs = parser.round_state
+        for p in range(4):
+            self.assertEqual(list(rs.hands_34[p]), TilesConverter.to_34_array(rs.hands_136[p]))
+            self.assertEqual(rs.hands_packed[p], sum(c * unit for c, unit in zip(rs.hands_34[p], _PACKED_UNIT)))
+
+    def test_cached_output_matches_uncached(self):
+        """メモを使った学習データが、メモを使わずに計算した場合と一致し、手牌の枚数表が常に手牌と整合するかテスト"""
+        cached = TransformerParser()
+        seen_choices = set()
+        for seed in range(200):
+            uncached = _UncachedParser()
+            cached.reset_game_state()
+            for tag, attrib in _random_game(seed):
+                element = ET.Element(tag, attrib)
+                cached.process_tag(element)
+                uncached.process_tag(element)
+                self.assert_hand_counts_consistent(cached)
+            got = [(d['player_pov'], d['label'], d['choices']) for d in cached.training_data]
+            expected = [(d['player_pov'], d['label'], d['choices']) for d in uncached.training_data]
+            self.assertEqual(got, expected, f"seed {seed}")
+            seen_choices.update(c.rsplit('_', 2)[0] if c.startswith('ACTION_CHII') else c.rstrip('0123456789_') for d in got for c in d[2])
+        # 比較が自明にならないよう、メモを使う各判定(リーチ・和了・鳴き)の選択肢が実際に生成されていることを確かめる
+        for choice in ('ACTION_RIICHI', 'ACTION_TSUMO_AGARI', 'ACTION_RON_AGARI', 'ACTION_PUNG', 'ACTION_CHII', 'ACTION_DAIMINKAN'):
+            self.assertIn(choice, seen_choices)
+
+if __name__ == '__main__':
+    unittest.main()
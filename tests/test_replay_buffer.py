@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from src.agent.replay_buffer import ReplayBuffer
+
+class TestReplayBuffer(unittest.TestCase):
+    def test_overwrites_oldest_when_full(self):
+        """容量を超えた場合に最も古い経験から上書きされるかテスト"""
+        buffer = ReplayBuffer(capacity=3, state_dim=2)
+        for i in range(4):
+            buffer.add(np.full(2, i), ("discard", i), float(i), np.full(2, i + 1), False)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(sorted(buffer.rewards.tolist()), [1.0, 2.0, 3.0])
+        self.assertEqual(buffer.actions[0], ("discard", 3))
+
+    def test_sample_returns_aligned_batch(self):
+        buffer = ReplayBuffer(capacity=10, state_dim=2)
+        for i in range(5):
+            buffer.add(np.full(2, i), ("discard", i), float(i), np.full(2, i + 1), i == 4)
+        states, actions, rewards, next_states, dones = buffer.sample(3)
+        self.assertEqual(states.shape, (3, 2))
+        self.assertEqual(states.dtype, np.float32)
+        self.assertEqual(len(set(rewards.tolist())), 3)
+        for state, action, reward, next_state, done in zip(states, actions, rewards, next_states, dones):
+            self.assertEqual(action, ("discard", int(reward)))
+            self.assertEqual(state[0], reward)
+            self.assertEqual(next_state[0], reward + 1)
+            self.assertEqual(done, reward == 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from src.env.vector_env import VectorMahjongEnv
+from src.env.subproc_env import SubprocMahjongEnv
+
+class TestVectorMahjongEnv(unittest.TestCase):
+    def setUp(self):
+        self.vec_env = VectorMahjongEnv(num_envs=3)
+
+    def test_reset_returns_state_per_env(self):
+        states = self.vec_env.reset()
+        self.assertEqual(len(states), 3)
+        self.assertFalse(self.vec_env.dones.any())
+        self.assertEqual(self.vec_env.scores.shape, (3, 4))
+
+    def test_scores_are_shared_with_each_env(self):
+        """各環境の点数変更が一括管理している点数表に反映されるかテスト"""
+        self.vec_env.envs[1].players[2].score -= 1000
+        self.assertEqual(self.vec_env.scores[1, 2], 24000)
+        self.assertEqual(self.vec_env.scores[0, 2], 25000)
+
+    def test_finished_env_is_not_stepped(self):
+        self.vec_env.dones[0] = True
+        env0 = self.vec_env.envs[0]
+        hand_before = list(env0.players[0].hand)
+        actions = [("discard", env.players[0].hand[0]) for env in self.vec_env.envs]
+        states, rewards, dones, infos = self.vec_env.step(actions)
+        self.assertEqual(env0.players[0].hand, hand_before)
+        self.assertEqual(len(states), 3)
+        self.assertEqual(rewards.shape, (3,))
+
+class TestSubprocMahjongEnv(unittest.TestCase):
+    def setUp(self):
+        self.env = SubprocMahjongEnv(num_envs=2)
+
+    def tearDown(self):
+        self.env.close()
+
+    def test_reset_and_step_in_worker_processes(self):
+        states = self.env.reset()
+        self.assertEqual(len(states), 2)
+        actions = [("discard", state["players"][0]["hand"][0]) for state in states]
+        next_states, rewards, dones, infos = self.env.step(actions)
+        self.assertEqual([s["current_player_id"] for s in next_states], [1, 1])
+        self.assertEqual(rewards.shape, (2,))
+        self.assertFalse(dones.any())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+import xml.etree.ElementTree as ET
+from src.env.mahjong_env import MahjongEnv
+from src.utils.parser import TransformerParser
+from src.utils.vectorizer import vectorize_event, vectorize_choice, vectorize_decision, MahjongVectorizer
+from src.constants import MAX_CONTEXT_LENGTH, MAX_CHOICES, VECTOR_DIM
+
+class TestVectorizer(unittest.TestCase):
+    def test_event_is_relative_to_pov(self):
+        """プレイヤーと点数が視点の席を0とした相対席で表されるかテスト"""
+        init = vectorize_event({"event_id": "INIT", "scores": (25000, 35000, 15000, 25000),
+                                "riichi_sticks": 1, "dora_indicators": [52]}, player_pov=1)
+        self.assertEqual(init[0], 2)
+        self.assertEqual(init[3:7].tolist(), [1.0, -1.0, 0.0, 0.0])
+        self.assertEqual(init[7], 1)
+        self.assertEqual(init[12], 52)
+        discard = vectorize_event({"event_id": "DISCARD", "player": 0, "tile": 33}, player_pov=1)
+        self.assertEqual(discard[[0, 1, 10]].tolist(), [4, 3, 33])
+
+    def test_parser_init_event_scores(self):
+        """天鳳ログのten (100点単位) から作られたINITイベントの点数が、点数として正規化されるかテスト"""
+        parser = TransformerParser()
+        parser.process_tag(ET.Element('GO', {'type': '169'}))
+        parser.process_tag(ET.Element('INIT', {
+            'seed': '0,0,1,2,3,52', 'ten': '250,350,150,250', 'oya': '0',
+            **{f'hai{i}': ','.join(str(t) for t in range(i * 13, (i + 1) * 13)) for i in range(4)}}))
+        init = parser.round_state.events[-1]
+        self.assertEqual(init['event_id'], 'INIT')
+        vec = vectorize_event(init, player_pov=1)
+        self.assertEqual(vec[3:7].tolist(), [1.0, -1.0, 0.0, 0.0])
+        self.assertEqual(vec[7], 1)
+        self.assertEqual(vec[12], 52)
+
+    def test_choice_layout(self):
+        """doc/model_architecture.mdの選択肢の例どおりにベクトル化されるかテスト"""
+        self.assertEqual(vectorize_choice("DISCARD_8")[:4].tolist(), [1, 8, 0, 0])
+        self.assertEqual(vectorize_choice("ACTION_RIICHI_24")[:4].tolist(), [2, 3, 24, 0])
+        self.assertEqual(vectorize_choice("ACTION_CHII_8_12")[:4].tolist(), [2, 5, 8, 12])
+        self.assertEqual(vectorize_choice("ACTION_TSUMO_AGARI")[:4].tolist(), [2, 1, 0, 0])
+
+    def test_decision_matches_per_row_vectorization(self):
+        """判断単位の行列が、イベント・選択肢を1件ずつベクトル化した結果と一致するかテスト"""
+        events = [{"event_id": "INIT", "scores": (25000, 35000, 15000, 25000), "riichi_sticks": 0, "dora_indicators": [5]}]
+        events += [{"event_id": "DRAW" if i % 2 else "DISCARD", "player": i % 4, "tile": i} for i in range(MAX_CONTEXT_LENGTH + 9)]
+        choices = [f"DISCARD_{t}" for t in range(MAX_CHOICES + 3)]
+        context, choice_matrix, mask = vectorize_decision(events, choices, player_pov=2)
+        self.assertEqual(context.shape, (MAX_CONTEXT_LENGTH, VECTOR_DIM))
+        self.assertEqual(choice_matrix.shape, (MAX_CHOICES, VECTOR_DIM))
+        for row, event in zip(context, events[-MAX_CONTEXT_LENGTH:]):
+            np.testing.assert_array_equal(row, vectorize_event(event, 2))
+        for row, choice in zip(choice_matrix, choices):
+            np.testing.assert_array_equal(row, vectorize_choice(choice))
+        self.assertEqual(mask.tolist(), [1.0] * MAX_CHOICES)
+
+        _, _, mask = vectorize_decision(events[:3], choices[:2], player_pov=2)
+        self.assertEqual(mask.sum(), 2)
+
+    def test_state_slot_layout(self):
+        """MahjongEnvの状態が、手番のプレイヤーを基準とした各スロットに書き込まれるかテスト"""
+        env = MahjongEnv()
+        env.current_player_id = 1
+        env.players[1].score = 35000
+        env.players[2].riichi = True
+        env.players[3].discards.append(0)
+        env.turn = 6
+        state = env._get_state()
+        vec = MahjongVectorizer().vectorize_state(state)
+        self.assertAlmostEqual(vec[2], 6 / 30.0)
+        self.assertEqual(vec[3:7].tolist(), [1.0, 0.0, 0.0, 0.0])
+        self.assertAlmostEqual(vec[8], len(env.deck.tiles) / 70.0)
+        self.assertEqual(vec[12], env.dora_indicators[0])
+        self.assertEqual(vec[13:17].tolist(), [0, 1, 0, 0])
+        self.assertEqual(vec[17:21].tolist(), [0, 0, 1, 0])
+        self.assertEqual(vec[21:25].tolist(), [0, 0, 0, 0])
+        self.assertEqual(vec[30:64].tolist(), env.players[1].hand_34.tolist())
+        # 他家の手牌は書き込まれない
+        self.assertFalse(vec[64:].any())
+
+        batch = MahjongVectorizer().vectorize_batch([state, None])
+        np.testing.assert_array_equal(batch[0], vec)
+        self.assertFalse(batch[1].any())
+
+if __name__ == '__main__':
+    unittest.main()